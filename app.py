@@ -3,20 +3,28 @@ AnyVideo Downloader - Advanced Video Downloader
 Developer: dr1p7.steez
 """
 
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, jsonify, send_file, g
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_talisman import Talisman
 import yt_dlp
+import orjson
+from cachetools import TTLCache
 import os
 import json
 import threading
+import heapq
+import itertools
+from collections import deque
+import secrets
+from concurrent.futures import ThreadPoolExecutor
 import time
 from datetime import datetime
 import re
 from config import Config
-from utils import print_banner
+from utils import print_banner, classify_error
 from security import (
     SecurityValidator, 
     RequestValidator, 
@@ -24,7 +32,22 @@ from security import (
     secure_headers
 )
 
+class ORJSONProvider(JSONProvider):
+    """Serialize jsonify() responses and parse request bodies with orjson"""
+    
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
+
+# Largest JSON body any route accepts (a full batch); larger bodies are
+# rejected with 413 while being read, even without a Content-Length
+BATCH_REQUEST_SIZE = Config.MAX_BATCH_SIZE * 2048 + 1024
+app.config['MAX_CONTENT_LENGTH'] = BATCH_REQUEST_SIZE
 
 # CORS configuration
 CORS(app, resources={
@@ -35,12 +58,13 @@ CORS(app, resources={
     }
 })
 
-# Rate limiting
+# Rate limiting (moving window; Redis storage runs it as an atomic Lua script)
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=Config.RATELIMIT_STORAGE_URI,
+    strategy=Config.RATELIMIT_STRATEGY
 )
 
 # Security headers (only in production)
@@ -58,9 +82,113 @@ if not Config.DEBUG:
 Config.init_app()
 DOWNLOAD_FOLDER = Config.DOWNLOAD_FOLDER
 
+# Download IDs: dl_<counter>_<8 url-safe random chars>
+_DL_ID_RE = re.compile(r'^dl_\d+_[A-Za-z0-9_-]{8}\Z')
+_download_counter = itertools.count(1)
+
+def new_download_id():
+    """Generate a unique download ID that does not reveal submission time"""
+    return f"dl_{next(_download_counter)}_{secrets.token_urlsafe(6)}"
+
 # Global variables to track downloads
-download_progress = {}
-download_history = []
+# Progress entries are bounded and expire. They are sharded by ID, each shard
+# with its own lock, so hooks and polls for different downloads rarely contend.
+# The lock is a Condition so progress streams can wait for the next update
+PROGRESS_SHARDS = 16
+_progress_shards = [
+    (TTLCache(maxsize=-(-Config.MAX_TRACKED_DOWNLOADS // PROGRESS_SHARDS), ttl=Config.PROGRESS_TTL),
+     threading.Condition())
+    for _ in range(PROGRESS_SHARDS)
+]
+download_history = deque(maxlen=50)  # Only the last 50 downloads are kept
+
+# Recent /api/info results keyed by URL, compacted to the fields returned
+_info_cache = TTLCache(maxsize=Config.INFO_CACHE_SIZE, ttl=Config.INFO_CACHE_TTL)
+_info_lock = threading.Lock()
+
+# Downloads run on a bounded pool; extra submissions wait as 'queued'
+DOWNLOAD_POOL = ThreadPoolExecutor(
+    max_workers=Config.CONCURRENT_DOWNLOADS,
+    thread_name_prefix='download'
+)
+download_futures = {}
+
+# Both download routes share one per-IP budget; a batch is charged per URL
+DOWNLOAD_RATE_LIMIT = "10 per minute"
+
+# yt-dlp reports every chunk; commit 'downloading' updates at most this often
+PROGRESS_FLUSH_INTERVAL = 0.25
+_last_flush = {}
+
+# Seconds between keep-alive comments on an idle progress stream
+PROGRESS_STREAM_KEEPALIVE = 15
+
+# Open progress streams each hold a server thread; past the limit clients
+# get 503 and fall back to polling
+_stream_slots = threading.BoundedSemaphore(Config.MAX_PROGRESS_STREAMS)
+
+def _progress_shard(download_id):
+    """Return the (entries, condition) shard holding a download"""
+    return _progress_shards[hash(download_id) % PROGRESS_SHARDS]
+
+def track_download(download_id, entry):
+    """Start tracking progress for a new download"""
+    shard, lock = _progress_shard(download_id)
+    with lock:
+        shard[download_id] = entry
+        lock.notify_all()
+
+def update_progress(download_id, **fields):
+    """Update a tracked download (ignored if the entry has expired)"""
+    shard, lock = _progress_shard(download_id)
+    with lock:
+        entry = shard.get(download_id)
+        if entry is not None:
+            entry.update(fields)
+            lock.notify_all()
+
+def stream_progress(download_id):
+    """
+    Yield server-sent events for a download until it completes or fails
+    
+    After PROGRESS_STREAM_MAX_AGE seconds a 'reconnect' event is sent and the
+    stream ends, so no thread is held for the whole download.
+    """
+    shard, lock = _progress_shard(download_id)
+    last = None
+    deadline = time.monotonic() + Config.PROGRESS_STREAM_MAX_AGE
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            yield "event: reconnect\ndata: {}\n\n"
+            return
+        
+        # Wait for a change, or send a keep-alive comment if there is none
+        with lock:
+            lock.wait_for(lambda: shard.get(download_id) != last,
+                          min(PROGRESS_STREAM_KEEPALIVE, remaining))
+            entry = shard.get(download_id)
+            snapshot = dict(entry) if entry is not None else None
+        
+        if snapshot is None:
+            yield f"data: {app.json.dumps({'error': 'Download not found'})}\n\n"
+            return
+        if snapshot == last:
+            if time.monotonic() < deadline:
+                yield ": keep-alive\n\n"
+            continue
+        
+        last = snapshot
+        yield f"data: {app.json.dumps(snapshot)}\n\n"
+        if snapshot.get('status') in ('completed', 'error'):
+            return
+
+def snapshot_progress(download_id):
+    """Return a shallow copy of a tracked download, or None"""
+    shard, lock = _progress_shard(download_id)
+    with lock:
+        entry = shard.get(download_id)
+        return dict(entry) if entry is not None else None
 
 class DownloadLogger:
     def __init__(self, download_id):
@@ -73,208 +201,362 @@ class DownloadLogger:
         pass
     
     def error(self, msg):
-        download_progress[self.download_id]['status'] = 'error'
-        download_progress[self.download_id]['error'] = msg
+        update_progress(self.download_id, status='error', error=msg)
 
 def progress_hook(d, download_id):
     """Hook to track download progress"""
     if d['status'] == 'downloading':
-        download_progress[download_id]['status'] = 'downloading'
+        # Throttle per download; status changes always go through
+        now = time.monotonic()
+        last = _last_flush.get(download_id)
+        if last is not None and now - last < PROGRESS_FLUSH_INTERVAL:
+            return
+        _last_flush[download_id] = now
+        
         # Extract just the filename, not the full path
         full_path = d.get('filename', 'Unknown')
-        download_progress[download_id]['filename'] = os.path.basename(full_path)
+        updates = {
+            'status': 'downloading',
+            'filename': os.path.basename(full_path)
+        }
         
         # Calculate progress
-        if 'total_bytes' in d:
-            total = d['total_bytes']
-            downloaded = d.get('downloaded_bytes', 0)
-            percent = (downloaded / total) * 100
-            download_progress[download_id]['progress'] = percent
-            download_progress[download_id]['downloaded'] = downloaded
-            download_progress[download_id]['total'] = total
-            download_progress[download_id]['speed'] = d.get('speed', 0)
-            download_progress[download_id]['eta'] = d.get('eta', 0)
-        elif 'total_bytes_estimate' in d:
-            total = d['total_bytes_estimate']
+        total = d.get('total_bytes') or d.get('total_bytes_estimate')
+        if total:
             downloaded = d.get('downloaded_bytes', 0)
-            percent = (downloaded / total) * 100
-            download_progress[download_id]['progress'] = percent
-            download_progress[download_id]['downloaded'] = downloaded
-            download_progress[download_id]['total'] = total
-            download_progress[download_id]['speed'] = d.get('speed', 0)
-            download_progress[download_id]['eta'] = d.get('eta', 0)
+            updates.update(
+                progress=(downloaded / total) * 100,
+                downloaded=downloaded,
+                total=total,
+                speed=d.get('speed', 0),
+                eta=d.get('eta', 0)
+            )
+        
+        update_progress(download_id, **updates)
     
     elif d['status'] == 'finished':
-        download_progress[download_id]['status'] = 'processing'
-        download_progress[download_id]['progress'] = 100
+        _last_flush.pop(download_id, None)
         # Extract just the filename, not the full path
         full_path = d.get('filename', 'Unknown')
-        download_progress[download_id]['filename'] = os.path.basename(full_path)
+        update_progress(
+            download_id,
+            status='processing',
+            progress=100,
+            filename=os.path.basename(full_path)
+        )
     
     elif d['status'] == 'error':
-        download_progress[download_id]['status'] = 'error'
-        download_progress[download_id]['error'] = str(d.get('error', 'Unknown error'))
+        _last_flush.pop(download_id, None)
+        update_progress(download_id, status='error', error=str(d.get('error', 'Unknown error')))
+
+# Static yt-dlp options for downloads (advanced bypass features)
+_DOWNLOAD_OPTS_BASE = {
+    # Advanced bypass options
+    'nocheckcertificate': True,
+    'no_warnings': False,
+    'ignoreerrors': False,
+    
+    # Geo-restriction bypass
+    'geo_bypass': True,
+    'geo_bypass_country': 'US',
+    
+    # User agent and headers (mimic real browser)
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'http_headers': {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'DNT': '1',
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Sec-Fetch-Dest': 'document',
+        'Sec-Fetch-Mode': 'navigate',
+        'Sec-Fetch-Site': 'none',
+        'Cache-Control': 'max-age=0',
+    },
+    
+    # Retry settings
+    'retries': 10,
+    'fragment_retries': 10,
+    'skip_unavailable_fragments': True,
+    'extractor_retries': 5,
+    
+    # Age restriction bypass
+    'age_limit': None,
+    
+    # Network optimization
+    'socket_timeout': 30,
+    'source_address': None,  # Bind to default interface
+    'concurrent_fragment_downloads': Config.FRAGMENT_WORKERS,
+    'http_chunk_size': Config.HTTP_CHUNK_SIZE,
+    
+    # Extractor arguments for better compatibility
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['android', 'web', 'ios'],
+            'player_skip': ['configs'],
+            'skip': ['hls'],
+        },
+        'generic': {
+            'forced': False,
+        }
+    },
+    
+    # Additional options
+    'prefer_insecure': False,
+    'no_check_certificate': True,
+    'call_home': False,
+}
+
+# Static yt-dlp options for info extraction
+_INFO_OPTS_BASE = {
+    'quiet': True,
+    'no_warnings': True,
+    'extract_flat': False,
+    
+    # Bypass options for info extraction
+    'nocheckcertificate': True,
+    'geo_bypass': True,
+    'geo_bypass_country': 'US',
+    'age_limit': None,
+    
+    # Headers
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'http_headers': {
+        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.9',
+    },
+    
+    # Extractor arguments
+    'extractor_args': {
+        'youtube': {
+            'player_client': ['android', 'web'],
+        },
+    },
+    
+    # Retry settings
+    'retries': 5,
+    'extractor_retries': 3,
+    
+    # Force generic extractor as fallback
+    'default_search': 'auto',
+}
+
+# Info extraction reuses one YoutubeDL per thread; building one costs ~50 ms
+_info_ydl = threading.local()
+
+def extract_video_info(url, ie_key=None):
+    """Extract video info with this thread's reusable YoutubeDL instance"""
+    ydl = getattr(_info_ydl, 'ydl', None)
+    if ydl is None:
+        ydl = _info_ydl.ydl = yt_dlp.YoutubeDL(dict(_INFO_OPTS_BASE))
+    
+    ydl.params['http_headers']['Referer'] = url
+    # Leaving the context closes the request director, so the next call
+    # rebuilds it with that call's Referer
+    with ydl:
+        return ydl.extract_info(url, download=False, ie_key=ie_key)
+
+# yt-dlp format options keyed by (format_type, quality); audio ignores quality
+_FORMAT_OPTS = {
+    # Try multiple format combinations for best compatibility
+    ('video', 'best'): {
+        'format': (
+            'bestvideo[ext=mp4]+bestaudio[ext=m4a]/'
+            'bestvideo+bestaudio/'
+            'best[ext=mp4]/'
+            'best'
+        ),
+        'merge_output_format': 'mp4',
+    },
+    ('video', '4k'): {
+        'format': (
+            'bestvideo[height>=2160][ext=mp4]+bestaudio[ext=m4a]/'
+            'bestvideo[height>=2160]+bestaudio/'
+            'best[height>=2160]/'
+            'bestvideo+bestaudio/'
+            'best'
+        ),
+        'merge_output_format': 'mp4',
+    },
+    ('video', '1080p'): {
+        'format': (
+            'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/'
+            'bestvideo[height<=1080]+bestaudio/'
+            'best[height<=1080]/'
+            'best'
+        ),
+        'merge_output_format': 'mp4',
+    },
+    ('video', '720p'): {
+        'format': (
+            'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/'
+            'bestvideo[height<=720]+bestaudio/'
+            'best[height<=720]/'
+            'best'
+        ),
+        'merge_output_format': 'mp4',
+    },
+    ('audio', None): {
+        'format': 'bestaudio/best',
+        'postprocessors': [{
+            'key': 'FFmpegExtractAudio',
+            'preferredcodec': 'mp3',
+            'preferredquality': '320',
+        }],
+        'keepvideo': False,
+    },
+}
+
+# User-facing messages for classify_error() codes
+_DOWNLOAD_ERRORS = {
+    'drm': 'DRM-protected content cannot be downloaded. Use official app (Netflix, Disney+, etc.)',
+    'login': 'Login required. Export cookies from browser. See COOKIE_GUIDE.md',
+    'unsupported': 'Site not supported or outdated. Update yt-dlp: pip install --upgrade yt-dlp',
+    'no_formats': 'Site not supported or outdated. Update yt-dlp: pip install --upgrade yt-dlp',
+    'not_found': 'Video not found (404). Video may be deleted or URL incorrect.',
+    'extraction': 'Extraction failed. Update yt-dlp: pip install --upgrade yt-dlp',
+    'cloudflare': 'Cloudflare protected. Install: pip install curl-cffi, then restart',
+}
+
+# /api/info error responses; 'details' defaults to the original error message
+_INFO_ERRORS = {
+    'drm': {
+        'error': 'This content is DRM-protected and cannot be downloaded.',
+        'suggestion': 'DRM bypass is illegal and not supported. Use official apps to watch.',
+        'details': 'Services like Netflix, Disney+, Amazon Prime, Hulu use DRM encryption which is legally protected and cannot be bypassed.'
+    },
+    'login': {
+        'error': 'This content requires login/authentication.',
+        'suggestion': 'Export cookies from your browser. See COOKIE_GUIDE.md for instructions.',
+        'details': 'Private, protected, or NSFW content requires you to be logged in.'
+    },
+    'unsupported': {
+        'error': 'This site is not supported or the URL format is incorrect.',
+        'suggestion': 'Try updating yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp'
+    },
+    'no_formats': {
+        'error': 'No video formats found. The site may have changed its format.',
+        'suggestion': 'Update yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp'
+    },
+    'not_found': {
+        'error': 'Video not found (404). The video may have been deleted or the URL is incorrect.',
+        'suggestion': 'Check the URL and try again.'
+    },
+    'extraction': {
+        'error': 'Failed to extract video information. The site format may have changed.',
+        'suggestion': 'Update yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp'
+    },
+    'cloudflare': {
+        'error': 'Site is protected by Cloudflare anti-bot.',
+        'suggestion': 'Install bypass: pip install curl-cffi, then restart. See CLOUDFLARE_BYPASS.md'
+    },
+}
 
 def download_video(url, download_id, quality='best', format_type='video'):
     """Download video in a separate thread with advanced bypass capabilities"""
     try:
-        download_progress[download_id]['status'] = 'starting'
+        update_progress(download_id, status='starting')
         
-        # Configure yt-dlp options with advanced bypass features
+        # Configure yt-dlp options: per-download values on top of the static base
         ydl_opts = {
+            **_DOWNLOAD_OPTS_BASE,
             'outtmpl': os.path.join(DOWNLOAD_FOLDER, '%(title)s.%(ext)s'),
             'progress_hooks': [lambda d: progress_hook(d, download_id)],
             'logger': DownloadLogger(download_id),
-            
-            # Advanced bypass options
-            'nocheckcertificate': True,
-            'no_warnings': False,
-            'ignoreerrors': False,
-            
-            # Geo-restriction bypass
-            'geo_bypass': True,
-            'geo_bypass_country': 'US',
-            
-            # User agent and headers (mimic real browser)
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate, br',
-                'DNT': '1',
-                'Connection': 'keep-alive',
-                'Upgrade-Insecure-Requests': '1',
-                'Sec-Fetch-Dest': 'document',
-                'Sec-Fetch-Mode': 'navigate',
-                'Sec-Fetch-Site': 'none',
-                'Cache-Control': 'max-age=0',
-            },
-            
-            # Retry settings
-            'retries': 10,
-            'fragment_retries': 10,
-            'skip_unavailable_fragments': True,
-            'extractor_retries': 5,
-            
-            # Age restriction bypass
-            'age_limit': None,
-            
-            # Network optimization
-            'socket_timeout': 30,
-            'source_address': None,  # Bind to default interface
-            
-            # Extractor arguments for better compatibility
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android', 'web', 'ios'],
-                    'player_skip': ['configs'],
-                    'skip': ['hls'],
-                },
-                'generic': {
-                    'forced': False,
-                }
-            },
-            
-            # Additional options
-            'prefer_insecure': False,
-            'no_check_certificate': True,
-            'call_home': False,
         }
         
         # Quality and format settings with multiple fallbacks
-        if format_type == 'video':
-            if quality == 'best':
-                # Try multiple format combinations for best compatibility
-                ydl_opts['format'] = (
-                    'bestvideo[ext=mp4]+bestaudio[ext=m4a]/'
-                    'bestvideo+bestaudio/'
-                    'best[ext=mp4]/'
-                    'best'
-                )
-                ydl_opts['merge_output_format'] = 'mp4'
-            elif quality == '4k':
-                ydl_opts['format'] = (
-                    'bestvideo[height>=2160][ext=mp4]+bestaudio[ext=m4a]/'
-                    'bestvideo[height>=2160]+bestaudio/'
-                    'best[height>=2160]/'
-                    'bestvideo+bestaudio/'
-                    'best'
-                )
-                ydl_opts['merge_output_format'] = 'mp4'
-            elif quality == '1080p':
-                ydl_opts['format'] = (
-                    'bestvideo[height<=1080][ext=mp4]+bestaudio[ext=m4a]/'
-                    'bestvideo[height<=1080]+bestaudio/'
-                    'best[height<=1080]/'
-                    'best'
-                )
-                ydl_opts['merge_output_format'] = 'mp4'
-            elif quality == '720p':
-                ydl_opts['format'] = (
-                    'bestvideo[height<=720][ext=mp4]+bestaudio[ext=m4a]/'
-                    'bestvideo[height<=720]+bestaudio/'
-                    'best[height<=720]/'
-                    'best'
-                )
-                ydl_opts['merge_output_format'] = 'mp4'
-        elif format_type == 'audio':
-            ydl_opts['format'] = 'bestaudio/best'
-            ydl_opts['postprocessors'] = [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '320',
-            }]
-            ydl_opts['keepvideo'] = False
+        ydl_opts.update(_FORMAT_OPTS.get(
+            (format_type, quality if format_type == 'video' else None), {}
+        ))
         
         # Download the video
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
             # Get video info first
             info = ydl.extract_info(url, download=False)
-            download_progress[download_id]['title'] = info.get('title', 'Unknown')
-            download_progress[download_id]['thumbnail'] = info.get('thumbnail', '')
-            download_progress[download_id]['duration'] = info.get('duration', 0)
-            download_progress[download_id]['uploader'] = info.get('uploader', 'Unknown')
+            title = info.get('title', 'Unknown')
+            update_progress(
+                download_id,
+                title=title,
+                thumbnail=info.get('thumbnail', ''),
+                duration=info.get('duration', 0),
+                uploader=info.get('uploader', 'Unknown')
+            )
             
-            # Download the video
-            ydl.download([url])
+            # Download the video, reusing the extracted info instead of
+            # letting ydl.download() run the extractor a second time
+            result = ydl.process_ie_result(info, download=True) or {}
+            entry = snapshot_progress(download_id) or {}
+            
+            # Schedule the downloaded file(s) for removal
+            filepaths = [d['filepath'] for d in result.get('requested_downloads', []) if d.get('filepath')]
+            if not filepaths and entry.get('filename'):
+                filepaths = [os.path.join(DOWNLOAD_FOLDER, entry['filename'])]
+            for filepath in filepaths:
+                schedule_removal(filepath)
             
             # Mark as completed
-            download_progress[download_id]['status'] = 'completed'
-            download_progress[download_id]['progress'] = 100
-            download_progress[download_id]['completed_at'] = datetime.now().isoformat()
+            completed_at = datetime.now().isoformat()
+            update_progress(download_id, status='completed', progress=100, completed_at=completed_at)
             
             # Add to history
             download_history.append({
                 'id': download_id,
                 'url': url,
-                'title': download_progress[download_id]['title'],
+                'title': title,
                 'quality': quality,
                 'format': format_type,
-                'completed_at': download_progress[download_id]['completed_at'],
-                'filename': download_progress[download_id].get('filename', '')
+                'completed_at': completed_at,
+                'filename': entry.get('filename', '')
             })
             
     except Exception as e:
         error_msg = str(e)
         print(f"Error downloading {url}: {error_msg}")
-        download_progress[download_id]['status'] = 'error'
         
         # Provide helpful error messages
-        if 'DRM' in error_msg or 'drm protection' in error_msg.lower():
-            download_progress[download_id]['error'] = 'DRM-protected content cannot be downloaded. Use official app (Netflix, Disney+, etc.)'
-        elif 'need to log in' in error_msg.lower() or 'login required' in error_msg.lower() or 'cookies' in error_msg.lower() or 'nsfw' in error_msg.lower():
-            download_progress[download_id]['error'] = 'Login required. Export cookies from browser. See COOKIE_GUIDE.md'
-        elif 'Unsupported URL' in error_msg or 'No video formats found' in error_msg:
-            download_progress[download_id]['error'] = 'Site not supported or outdated. Update yt-dlp: pip install --upgrade yt-dlp'
-        elif 'HTTP Error 404' in error_msg:
-            download_progress[download_id]['error'] = 'Video not found (404). Video may be deleted or URL incorrect.'
-        elif 'Unable to extract' in error_msg or 'Failed to parse' in error_msg:
-            download_progress[download_id]['error'] = 'Extraction failed. Update yt-dlp: pip install --upgrade yt-dlp'
-        elif 'Cloudflare' in error_msg or 'HTTP Error 403' in error_msg or 'impersonate' in error_msg:
-            download_progress[download_id]['error'] = 'Cloudflare protected. Install: pip install curl-cffi, then restart'
-        else:
-            download_progress[download_id]['error'] = error_msg
+        error = _DOWNLOAD_ERRORS.get(classify_error(error_msg), error_msg)
+        
+        update_progress(download_id, status='error', error=error)
+    finally:
+        _last_flush.pop(download_id, None)
+
+def queue_download(url, quality, format_type):
+    """Track a validated download and submit it to the pool; returns its ID"""
+    # Generate unique download ID
+    download_id = new_download_id()
+    
+    # Initialize progress tracking
+    track_download(download_id, {
+        'id': download_id,
+        'url': url,
+        'status': 'queued',
+        'progress': 0,
+        'quality': quality,
+        'format': format_type,
+        'started_at': datetime.now().isoformat()
+    })
+    
+    # Queue download on the worker pool
+    future = DOWNLOAD_POOL.submit(download_video, url, download_id, quality, format_type)
+    download_futures[download_id] = future
+    future.add_done_callback(lambda f: download_futures.pop(download_id, None))
+    
+    return download_id
+
+def backlog_full(count=1):
+    """True if queueing count more downloads would exceed MAX_QUEUED_DOWNLOADS"""
+    return len(download_futures) + count > Config.MAX_QUEUED_DOWNLOADS
+
+def backlog_full_response():
+    """503 returned while the download queue is full"""
+    return jsonify({
+        'error': 'Download queue is full',
+        'suggestion': 'Please try again in a few minutes'
+    }), 503, {'Retry-After': '60'}
 
 @app.route('/')
 @secure_headers()
@@ -308,14 +590,14 @@ def bad_request(e):
     }), 400
 
 @app.route('/api/download', methods=['POST'])
-@limiter.limit("10 per minute")
+@limiter.shared_limit(DOWNLOAD_RATE_LIMIT, scope='downloads')
 @RequestValidator.check_request_size(max_size=2048)
 @RequestValidator.validate_json_request(required_fields=['url'])
 @secure_headers()
 def start_download():
     """Start a video download with security validation"""
     try:
-        data = request.get_json()
+        data = g.json_data
         url = data.get('url', '').strip()
         quality = data.get('quality', 'best')
         format_type = data.get('format', 'video')
@@ -342,24 +624,10 @@ def start_download():
                 'error': 'Invalid format parameter'
             }), 400
         
-        # Generate unique download ID
-        download_id = f"download_{int(time.time() * 1000)}"
-        
-        # Initialize progress tracking
-        download_progress[download_id] = {
-            'id': download_id,
-            'url': url,
-            'status': 'queued',
-            'progress': 0,
-            'quality': quality,
-            'format': format_type,
-            'started_at': datetime.now().isoformat()
-        }
+        if backlog_full():
+            return backlog_full_response()
         
-        # Start download in a separate thread
-        thread = threading.Thread(target=download_video, args=(url, download_id, quality, format_type))
-        thread.daemon = True
-        thread.start()
+        download_id = queue_download(url, quality, format_type)
         
         return jsonify({
             'success': True,
@@ -370,6 +638,85 @@ def start_download():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/download/batch', methods=['POST'])
+@limiter.shared_limit(
+    DOWNLOAD_RATE_LIMIT, scope='downloads',
+    cost=RequestValidator.json_list_length('urls', Config.MAX_BATCH_SIZE, BATCH_REQUEST_SIZE)
+)
+@RequestValidator.check_request_size(max_size=BATCH_REQUEST_SIZE)
+@RequestValidator.validate_json_request(required_fields=['urls'])
+@secure_headers()
+def start_batch_download():
+    """Start several video downloads in one request with security validation"""
+    try:
+        data = g.json_data
+        urls = data.get('urls')
+        quality = data.get('quality', 'best')
+        format_type = data.get('format', 'video')
+        
+        # Validate URL list
+        if not isinstance(urls, list):
+            return jsonify({
+                'error': 'Invalid URL list',
+                'suggestion': 'urls must be a list of URLs'
+            }), 400
+        if len(urls) > Config.MAX_BATCH_SIZE:
+            return jsonify({
+                'error': 'Too many URLs',
+                'suggestion': f'Submit at most {Config.MAX_BATCH_SIZE} URLs per batch'
+            }), 400
+        
+        # Validate quality
+        is_valid, quality = SecurityValidator.validate_quality(quality)
+        if not is_valid:
+            return jsonify({
+                'error': 'Invalid quality parameter'
+            }), 400
+        
+        # Validate format
+        is_valid, format_type = SecurityValidator.validate_format(format_type)
+        if not is_valid:
+            return jsonify({
+                'error': 'Invalid format parameter'
+            }), 400
+        
+        # Collect every valid URL; report the rest by position
+        valid_urls = []
+        errors = []
+        for index, url in enumerate(urls):
+            if not isinstance(url, str):
+                errors.append({'index': index, 'error': 'Invalid URL format'})
+                continue
+            url = url.strip()
+            is_valid, error_msg = SecurityValidator.validate_url(url)
+            if not is_valid:
+                errors.append({'index': index, 'error': error_msg})
+                continue
+            valid_urls.append(url)
+        
+        if not valid_urls:
+            return jsonify({
+                'error': 'No valid URLs',
+                'errors': errors
+            }), 400
+        
+        # Queue the whole batch or none of it
+        if backlog_full(len(valid_urls)):
+            return backlog_full_response()
+        
+        download_ids = [queue_download(url, quality, format_type) for url in valid_urls]
+        
+        # 207 Multi-Status when only some URLs were accepted
+        return jsonify({
+            'success': True,
+            'download_ids': download_ids,
+            'errors': errors,
+            'message': f'{len(download_ids)} download(s) started'
+        }), 207 if errors else 200
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/progress/<download_id>', methods=['GET'])
 @limiter.limit("60 per minute")
 @secure_headers()
@@ -378,15 +725,45 @@ def get_progress(download_id):
     # Sanitize download_id
     download_id = SecurityValidator.sanitize_string(download_id, max_length=50)
     
-    # Validate format (should be download_TIMESTAMP)
-    if not re.match(r'^download_\d+$', download_id):
+    # Validate format (should match new_download_id)
+    if not _DL_ID_RE.match(download_id):
         return jsonify({'error': 'Invalid download ID'}), 400
     
-    if download_id in download_progress:
-        return jsonify(download_progress[download_id])
+    entry = snapshot_progress(download_id)
+    if entry is not None:
+        return jsonify(entry)
     else:
         return jsonify({'error': 'Download not found'}), 404
 
+@app.route('/api/progress/stream/<download_id>', methods=['GET'])
+@limiter.limit("10 per minute")
+@secure_headers()
+def get_progress_stream(download_id):
+    """Stream download progress as server-sent events"""
+    # Sanitize download_id
+    download_id = SecurityValidator.sanitize_string(download_id, max_length=50)
+    
+    # Validate format (should match new_download_id)
+    if not _DL_ID_RE.match(download_id):
+        return jsonify({'error': 'Invalid download ID'}), 400
+    
+    if snapshot_progress(download_id) is None:
+        return jsonify({'error': 'Download not found'}), 404
+    
+    if not _stream_slots.acquire(blocking=False):
+        return jsonify({
+            'error': 'Too many progress streams',
+            'suggestion': 'Poll /api/progress instead'
+        }), 503
+    
+    response = Response(
+        stream_progress(download_id),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.call_on_close(_stream_slots.release)
+    return response
+
 @app.route('/api/info', methods=['POST'])
 @limiter.limit("20 per minute")
 @RequestValidator.check_request_size(max_size=2048)
@@ -395,7 +772,7 @@ def get_progress(download_id):
 def get_video_info():
     """Get video information without downloading - with security validation"""
     try:
-        data = request.get_json()
+        data = g.json_data
         url = data.get('url', '').strip()
         
         # Validate URL
@@ -407,44 +784,14 @@ def get_video_info():
                 'details': 'Please provide a valid HTTP/HTTPS URL'
             }), 400
         
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
-            
-            # Bypass options for info extraction
-            'nocheckcertificate': True,
-            'geo_bypass': True,
-            'geo_bypass_country': 'US',
-            'age_limit': None,
-            
-            # Headers
-            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'http_headers': {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Referer': url,
-            },
-            
-            # Extractor arguments
-            'extractor_args': {
-                'youtube': {
-                    'player_client': ['android', 'web'],
-                },
-            },
-            
-            # Retry settings
-            'retries': 5,
-            'extractor_retries': 3,
-            
-            # Force generic extractor as fallback
-            'default_search': 'auto',
-        }
+        # Serve repeat lookups from cache
+        with _info_lock:
+            cached = _info_cache.get(url)
+        if cached is not None:
+            return jsonify({'success': True, **cached})
         
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
+            info = extract_video_info(url)
         except Exception as extract_error:
             # Check for various error types
             error_str = str(extract_error)
@@ -452,27 +799,14 @@ def get_video_info():
             print(f"Error type: {type(extract_error).__name__}")
             print(f"Error message: {error_str}")
             
-            # Check for DRM protection
-            if 'DRM' in error_str or 'drm protection' in error_str.lower():
-                return jsonify({
-                    'error': 'This content is DRM-protected and cannot be downloaded.',
-                    'suggestion': 'DRM bypass is illegal and not supported. Use official apps (Netflix, Disney+, etc.) to watch.',
-                    'details': 'Services like Netflix, Disney+, Amazon Prime, Hulu, HBO Max use DRM encryption which is legally protected.'
-                }), 500
-            
-            if 'need to log in' in error_str.lower() or 'login required' in error_str.lower():
-                return jsonify({
-                    'error': 'This content requires login/authentication.',
-                    'suggestion': 'This is private content. See COOKIE_GUIDE.md for cookie export instructions.',
-                    'details': error_str
-                }), 500
+            # DRM and login errors won't be fixed by the generic extractor
+            if classify_error(error_str) in ('drm', 'login'):
+                raise
             
             # If extractor fails, try with force_generic_extractor
             print(f"Trying generic extractor as fallback...")
             try:
-                ydl_opts['force_generic_extractor'] = True
-                with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
+                info = extract_video_info(url, ie_key='Generic')
                 print("Generic extractor succeeded!")
             except Exception as generic_error:
                 # Generic extractor also failed, re-raise original error
@@ -497,8 +831,7 @@ def get_video_info():
             # Sort by height descending
             formats.sort(key=lambda x: x['height'], reverse=True)
         
-        return jsonify({
-            'success': True,
+        video_info = {
             'title': info.get('title', 'Unknown'),
             'duration': info.get('duration', 0),
             'thumbnail': info.get('thumbnail', ''),
@@ -506,67 +839,31 @@ def get_video_info():
             'description': info.get('description', '')[:200],
             'view_count': info.get('view_count', 0),
             'formats': formats[:10]  # Limit to top 10 formats
-        })
+        }
+        with _info_lock:
+            _info_cache[url] = video_info
+        
+        return jsonify({'success': True, **video_info})
             
     except Exception as e:
         error_msg = str(e)
         
         # Provide helpful error messages
-        if 'DRM' in error_msg or 'drm protection' in error_msg.lower():
-            return jsonify({
-                'error': 'This content is DRM-protected and cannot be downloaded.',
-                'suggestion': 'DRM bypass is illegal and not supported. Use official apps to watch.',
-                'details': 'Services like Netflix, Disney+, Amazon Prime, Hulu use DRM encryption which is legally protected and cannot be bypassed.'
-            }), 500
-        elif 'need to log in' in error_msg.lower() or 'login required' in error_msg.lower() or 'cookies' in error_msg.lower() or 'nsfw' in error_msg.lower():
-            return jsonify({
-                'error': 'This content requires login/authentication.',
-                'suggestion': 'Export cookies from your browser. See COOKIE_GUIDE.md for instructions.',
-                'details': 'Private, protected, or NSFW content requires you to be logged in.'
-            }), 500
-        elif 'Unsupported URL' in error_msg:
-            return jsonify({
-                'error': 'This site is not supported or the URL format is incorrect.',
-                'suggestion': 'Try updating yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp',
-                'details': error_msg
-            }), 500
-        elif 'No video formats found' in error_msg:
-            return jsonify({
-                'error': 'No video formats found. The site may have changed its format.',
-                'suggestion': 'Update yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp',
-                'details': error_msg
-            }), 500
-        elif 'HTTP Error 404' in error_msg:
-            return jsonify({
-                'error': 'Video not found (404). The video may have been deleted or the URL is incorrect.',
-                'suggestion': 'Check the URL and try again.',
-                'details': error_msg
-            }), 500
-        elif 'Unable to extract' in error_msg or 'Failed to parse' in error_msg:
-            return jsonify({
-                'error': 'Failed to extract video information. The site format may have changed.',
-                'suggestion': 'Update yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp',
-                'details': error_msg
-            }), 500
-        elif 'Cloudflare' in error_msg or 'HTTP Error 403' in error_msg or 'impersonate' in error_msg:
-            return jsonify({
-                'error': 'Site is protected by Cloudflare anti-bot.',
-                'suggestion': 'Install bypass: pip install curl-cffi, then restart. See CLOUDFLARE_BYPASS.md',
-                'details': error_msg
-            }), 500
-        else:
+        response = _INFO_ERRORS.get(classify_error(error_msg))
+        if response is None:
             return jsonify({
                 'error': error_msg,
                 'suggestion': 'Try updating yt-dlp: Run update_ytdlp.bat or: pip install --upgrade yt-dlp'
             }), 500
+        return jsonify({'details': error_msg, **response}), 500
 
 @app.route('/api/history', methods=['GET'])
 @limiter.limit("30 per minute")
 @secure_headers()
 def get_history():
     """Get download history"""
-    # Limit history to last 50 items for security
-    return jsonify(download_history[-50:])
+    # History is capped at the last 50 items for security
+    return jsonify(list(download_history))
 
 @app.route('/api/downloads', methods=['GET'])
 @limiter.limit("20 per minute")
@@ -575,14 +872,15 @@ def list_downloads():
     """List all files in download folder with security"""
     try:
         files = []
-        for filename in os.listdir(DOWNLOAD_FOLDER):
-            filepath = os.path.join(DOWNLOAD_FOLDER, filename)
-            if os.path.isfile(filepath):
-                files.append({
-                    'name': filename,
-                    'size': os.path.getsize(filepath),
-                    'modified': datetime.fromtimestamp(os.path.getmtime(filepath)).isoformat()
-                })
+        with os.scandir(DOWNLOAD_FOLDER) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    stat = entry.stat()
+                    files.append({
+                        'name': entry.name,
+                        'size': stat.st_size,
+                        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+                    })
         return jsonify(files)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -612,19 +910,55 @@ def download_file(filename):
         filepath = os.path.join(DOWNLOAD_FOLDER, filename)
         
         # Check if file exists
-        if not os.path.exists(filepath):
+        if not os.path.isfile(filepath):
             return jsonify({'error': 'File not found'}), 404
         
-        # Send file to browser with download prompt
+        # Send file to browser with download prompt. Conditional responses
+        # support Range requests (resumable downloads), and the file object is
+        # handed to the server's wsgi.file_wrapper so gunicorn can sendfile() it
         return send_file(
             filepath,
             as_attachment=True,
-            download_name=filename
+            download_name=filename,
+            conditional=True,
+            max_age=0
         )
     except Exception as e:
         print(f"⚠️ Error serving file {filename}: {e}")
         return jsonify({'error': str(e)}), 500
 
+# Downloads are kept for 10 minutes - enough time for users to fetch them
+DOWNLOAD_RETENTION = 600
+
+# Full folder scans (for files nobody scheduled) run this often, in seconds
+FULL_CLEANUP_INTERVAL = 3600
+
+# Min-heap of (remove_at, filepath) for completed downloads
+_expiry = []
+_expiry_lock = threading.Lock()
+
+def schedule_removal(filepath, delay=DOWNLOAD_RETENTION):
+    """Schedule a downloaded file for removal after delay seconds"""
+    with _expiry_lock:
+        heapq.heappush(_expiry, (time.time() + delay, filepath))
+
+def expire_downloads():
+    """Remove scheduled files whose retention has passed, without scanning the folder"""
+    now = time.time()
+    expired = []
+    with _expiry_lock:
+        while _expiry and _expiry[0][0] <= now:
+            expired.append(heapq.heappop(_expiry)[1])
+    
+    for filepath in expired:
+        try:
+            os.remove(filepath)
+            print(f"🧹 Cleaned up old file: {os.path.basename(filepath)}")
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"⚠️ Failed to delete {os.path.basename(filepath)}: {e}")
+
 def cleanup_old_downloads():
     """
     Delete downloads older than 10 minutes to prevent storage bloat
@@ -634,30 +968,54 @@ def cleanup_old_downloads():
         current_time = time.time()
         cleanup_count = 0
         
-        for filename in os.listdir(DOWNLOAD_FOLDER):
-            filepath = os.path.join(DOWNLOAD_FOLDER, filename)
-            
-            # Check if file is older than 10 minutes (600 seconds)
-            if os.path.isfile(filepath):
-                file_age = current_time - os.path.getmtime(filepath)
-                if file_age > 600:  # 10 minutes - enough time for downloads
-                    try:
-                        os.remove(filepath)
-                        cleanup_count += 1
-                        print(f"🧹 Cleaned up old file: {filename}")
-                    except Exception as e:
-                        print(f"⚠️ Failed to delete {filename}: {e}")
+        with os.scandir(DOWNLOAD_FOLDER) as entries:
+            for entry in entries:
+                # Check if file is older than 10 minutes (600 seconds)
+                if entry.is_file():
+                    file_age = current_time - entry.stat().st_mtime
+                    if file_age > DOWNLOAD_RETENTION:
+                        try:
+                            os.remove(entry.path)
+                            cleanup_count += 1
+                            print(f"🧹 Cleaned up old file: {entry.name}")
+                        except Exception as e:
+                            print(f"⚠️ Failed to delete {entry.name}: {e}")
         
         if cleanup_count > 0:
             print(f"✅ Cleanup complete: Removed {cleanup_count} old file(s)")
     except Exception as e:
         print(f"⚠️ Cleanup error: {e}")
 
-def schedule_cleanup():
-    """Schedule cleanup to run every 30 seconds"""
+# Set to stop the cleanup thread
+cleanup_stop = threading.Event()
+CLEANUP_INTERVAL = 30
+_cleanup_thread = None
+_cleanup_thread_lock = threading.Lock()
+
+def _cleanup_loop(interval):
+    """Run cleanup until cleanup_stop is set"""
+    # Full scans catch leftovers (failed downloads, files from before a
+    # restart); in between only the scheduled files are checked
     cleanup_old_downloads()
-    from threading import Timer
-    Timer(30, schedule_cleanup).start()  # Run every 30 seconds
+    last_scan = time.monotonic()
+    while not cleanup_stop.wait(interval):
+        expire_downloads()
+        if time.monotonic() - last_scan >= FULL_CLEANUP_INTERVAL:
+            cleanup_old_downloads()
+            last_scan = time.monotonic()
+
+def schedule_cleanup(interval=CLEANUP_INTERVAL):
+    """Start the background cleanup thread unless it is already running"""
+    global _cleanup_thread
+    with _cleanup_thread_lock:
+        if _cleanup_thread is None or not _cleanup_thread.is_alive():
+            _cleanup_thread = threading.Thread(target=_cleanup_loop, args=(interval,), name='cleanup', daemon=True)
+            _cleanup_thread.start()
+        return _cleanup_thread
+
+# Start cleanup on import so it also runs under gunicorn, where __main__ is
+# not executed; without it the expiry heap would only ever grow
+schedule_cleanup()
 
 if __name__ == '__main__':
     # Print banner
@@ -671,9 +1029,9 @@ if __name__ == '__main__':
     print("   • Twitch, Reddit, Dailymotion, and many more!")
     print("=" * 60)
     
-    # Start cleanup scheduler
-    print("🧹 Starting automatic cleanup scheduler (runs every hour)")
-    schedule_cleanup()
+    # Cleanup scheduler (started on import)
+    print(f"🧹 Automatic cleanup running (expired files every {CLEANUP_INTERVAL}s, "
+          f"full folder scan every {FULL_CLEANUP_INTERVAL // 3600} hour)")
     
     # Get port from environment variable (for cloud deployment) or use default
     port = int(os.environ.get('PORT', Config.PORT))
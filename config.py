@@ -2,6 +2,7 @@
 # Developer: dr1p7.steez
 
 import os
+from types import MappingProxyType
 
 class Config:
     """Configuration settings for AnyVideo Downloader"""
@@ -16,8 +17,17 @@ class Config:
     # Download Settings
     DOWNLOAD_FOLDER = os.path.join(os.getcwd(), 'downloads')
     
+    # Progress Tracking (entries expire after PROGRESS_TTL seconds)
+    MAX_TRACKED_DOWNLOADS = int(os.environ.get('MAX_TRACKED_DOWNLOADS', 1000))
+    PROGRESS_TTL = 3600
+    
+    # Video Info Cache (seconds)
+    INFO_CACHE_SIZE = 512
+    INFO_CACHE_TTL = 300
+    
     # yt-dlp Settings - Advanced bypass options
-    YTDLP_OPTIONS = {
+    # Read-only: build per-request options with {**Config.YTDLP_OPTIONS, ...}
+    YTDLP_OPTIONS = MappingProxyType({
         # SSL/Certificate bypass
         'nocheckcertificate': True,
         
@@ -39,25 +49,25 @@ class Config:
         'skip_unavailable_fragments': True,
         
         # Headers to bypass restrictions
-        'http_headers': {
+        'http_headers': MappingProxyType({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'en-us,en;q=0.5',
             'Sec-Fetch-Mode': 'navigate',
-        },
+        }),
         
         # Age restriction bypass
         'age_limit': None,
         
         # Extractor options
         'extractor_retries': 3,
-        'extractor_args': {
-            'youtube': {
-                'skip': ['hls', 'dash'],
-                'player_skip': ['webpage', 'configs'],
-                'player_client': ['android', 'web'],
-            }
-        },
+        'extractor_args': MappingProxyType({
+            'youtube': MappingProxyType({
+                'skip': ('hls', 'dash'),
+                'player_skip': ('webpage', 'configs'),
+                'player_client': ('android', 'web'),
+            })
+        }),
         
         # Don't stop on errors
         'ignoreerrors': False,
@@ -68,7 +78,7 @@ class Config:
         
         # Verbose for debugging
         'verbose': False,
-    }
+    })
     
     # Quality Settings
     QUALITY_FORMATS = {
@@ -117,9 +127,23 @@ class Config:
     ENABLE_METADATA_EMBED = True
     
     # Advanced Features
-    CONCURRENT_DOWNLOADS = 1  # Number of simultaneous downloads
+    CONCURRENT_DOWNLOADS = int(os.environ.get('MAX_CONCURRENT_DOWNLOADS', 4))  # Number of simultaneous downloads
+    MAX_BATCH_SIZE = 10  # Maximum URLs per batch download request (each counts against the download rate limit)
+    MAX_QUEUED_DOWNLOADS = int(os.environ.get('MAX_QUEUED_DOWNLOADS', 50))  # Queued + running downloads before new ones get 503
     RETRY_ATTEMPTS = 3
     FRAGMENT_RETRIES = 10
+    FRAGMENT_WORKERS = int(os.environ.get('YTDLP_FRAG_WORKERS', 5))  # Parallel HLS/DASH fragment downloads
+    HTTP_CHUNK_SIZE = 10 * 1024 * 1024  # Range request size for non-fragmented downloads
+    
+    # Progress Streams (each open stream holds a server thread)
+    # Keep MAX_PROGRESS_STREAMS well below gunicorn --threads in the Procfile
+    MAX_PROGRESS_STREAMS = int(os.environ.get('MAX_PROGRESS_STREAMS', 8))
+    PROGRESS_STREAM_MAX_AGE = 60  # Seconds before a stream asks the client to reconnect
+    
+    # Rate Limiting
+    # Use a redis:// URI in production so limits are shared across workers/hosts
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_STRATEGY = 'moving-window'
     
     # Proxy Settings (if needed)
     PROXY = None  # Example: 'http://proxy.example.com:8080'
@@ -4,22 +4,48 @@ Developer: dr1p7.steez
 """
 
 import re
-import bleach
+import base64
+import ipaddress
+import socket
 from urllib.parse import urlparse
-from functools import wraps
-from flask import request, jsonify
+from functools import wraps, lru_cache
+from flask import request, jsonify, make_response, g
 import hashlib
+import threading
 import time
+from time import monotonic as _monotonic
+from collections import deque, OrderedDict
 
 class SecurityValidator:
     """Validates and sanitizes user inputs"""
     
     # Allowed URL schemes
-    ALLOWED_SCHEMES = ['http', 'https']
+    ALLOWED_SCHEMES = ('http', 'https')
     
     # Maximum URL length
     MAX_URL_LENGTH = 2048
     
+    # Hostnames that always resolve to the local machine
+    _LOCAL_HOSTS = frozenset({'localhost'})
+    
+    # Name suffixes reserved for local or internal networks (includes
+    # metadata.google.internal); checked in one endswith call. IP hosts,
+    # including shorthand forms such as 10.1 or 127.1, are canonicalised
+    # by _parse_ip_host and classified there instead of by prefix
+    _BLOCKED_HOST_SUFFIXES = (
+        '.localhost',
+        '.local',
+        '.localdomain',
+        '.internal',
+        '.intranet',
+        '.lan',
+        '.home.arpa',
+    )
+    
+    # Accepted quality and format parameters
+    _ALLOWED_QUALITIES = frozenset({'best', '4k', '1080p', '720p', '480p'})
+    _ALLOWED_FORMATS = frozenset({'video', 'audio'})
+    
     # Blocked patterns (SQL injection, XSS, etc.)
     BLOCKED_PATTERNS = [
         r'<script[^>]*>.*?</script>',
@@ -43,6 +69,17 @@ class SecurityValidator:
         r'/\*.*\*/',  # SQL comment
     ]
     
+    # Hosts that may be an IPv4 address in shorthand, decimal, octal or hex
+    # form (10.1, 2130706433, 0x7f000001, 0177.0.0.1)
+    _NUMERIC_HOST_RE = re.compile(r'^[0-9a-fx.]+\Z')
+    
+    # All blocked patterns fused into one regex, compiled once at import,
+    # so a URL is scanned in a single pass
+    _BLOCKED_COMBINED = re.compile(
+        '|'.join(f'(?:{p})' for p in BLOCKED_PATTERNS),
+        re.IGNORECASE
+    )
+    
     @staticmethod
     def validate_url(url):
         """
@@ -57,46 +94,14 @@ class SecurityValidator:
         if not url:
             return False, "URL is required"
         
-        # Check length
-        if len(url) > SecurityValidator.MAX_URL_LENGTH:
-            return False, "URL too long"
-        
-        # Check for blocked patterns
-        url_lower = url.lower()
-        for pattern in SecurityValidator.BLOCKED_PATTERNS:
-            if re.search(pattern, url_lower, re.IGNORECASE):
-                return False, "URL contains suspicious content"
-        
-        # Parse URL
-        try:
-            parsed = urlparse(url)
-        except Exception:
+        if not isinstance(url, str):
             return False, "Invalid URL format"
         
-        # Check scheme
-        if parsed.scheme not in SecurityValidator.ALLOWED_SCHEMES:
-            return False, f"Only {', '.join(SecurityValidator.ALLOWED_SCHEMES)} URLs are allowed"
-        
-        # Check for localhost/private IPs (prevent SSRF)
-        hostname = parsed.hostname
-        if hostname:
-            hostname_lower = hostname.lower()
-            
-            # Block localhost
-            if hostname_lower in ['localhost', '127.0.0.1', '0.0.0.0', '::1']:
-                return False, "Local URLs are not allowed"
-            
-            # Block private IP ranges
-            if hostname_lower.startswith('192.168.') or \
-               hostname_lower.startswith('10.') or \
-               hostname_lower.startswith('172.'):
-                return False, "Private IP addresses are not allowed"
-            
-            # Block metadata endpoints
-            if '169.254.169.254' in hostname_lower:
-                return False, "Metadata endpoints are not allowed"
+        # Check length (before caching, so oversized input is never retained)
+        if len(url) > SecurityValidator.MAX_URL_LENGTH:
+            return False, "URL too long"
         
-        return True, None
+        return _validate_url_cached(url)
     
     @staticmethod
     def sanitize_string(text, max_length=500):
@@ -113,16 +118,8 @@ class SecurityValidator:
         if not text:
             return ""
         
-        # Limit length
-        text = str(text)[:max_length]
-        
-        # Remove HTML tags and suspicious content
-        text = bleach.clean(text, tags=[], strip=True)
-        
-        # Remove null bytes
-        text = text.replace('\x00', '')
-        
-        return text.strip()
+        # Limit length (before caching, so oversized input is never retained)
+        return _sanitize_cached(str(text)[:max_length])
     
     @staticmethod
     def validate_quality(quality):
@@ -135,14 +132,14 @@ class SecurityValidator:
         Returns:
             tuple: (is_valid, sanitized_quality)
         """
-        allowed_qualities = ['best', '4k', '1080p', '720p', '480p']
-        
         if not quality:
             return True, 'best'
         
-        quality = str(quality).lower().strip()
+        if not isinstance(quality, str):
+            quality = str(quality)
+        quality = quality.lower().strip()
         
-        if quality in allowed_qualities:
+        if quality in SecurityValidator._ALLOWED_QUALITIES:
             return True, quality
         
         return False, 'best'
@@ -158,27 +155,142 @@ class SecurityValidator:
         Returns:
             tuple: (is_valid, sanitized_format)
         """
-        allowed_formats = ['video', 'audio']
-        
         if not format_type:
             return True, 'video'
         
-        format_type = str(format_type).lower().strip()
+        if not isinstance(format_type, str):
+            format_type = str(format_type)
+        format_type = format_type.lower().strip()
         
-        if format_type in allowed_formats:
+        if format_type in SecurityValidator._ALLOWED_FORMATS:
             return True, format_type
         
         return False, 'video'
 
 
+def _parse_ip_host(hostname):
+    """
+    Parse a URL hostname as an IP address
+    
+    Numeric IPv4 forms that ipaddress rejects but the resolver accepts
+    (10.1, 2130706433, 0x7f000001, 0177.0.0.1) are canonicalised with
+    inet_aton, so they cannot bypass the SSRF checks.
+    
+    Returns:
+        IPv4Address or IPv6Address, or None for a host name
+    """
+    try:
+        ip = ipaddress.ip_address(hostname)
+    except ValueError:
+        if not SecurityValidator._NUMERIC_HOST_RE.match(hostname):
+            return None
+        try:
+            return ipaddress.IPv4Address(socket.inet_aton(hostname))
+        except OSError:
+            return None
+    
+    if ip.version == 6 and ip.ipv4_mapped:
+        return ip.ipv4_mapped
+    return ip
+
+
+# Repeat URLs (retries, playlist items, info probes) are validated from cache
+@lru_cache(maxsize=4096)
+def _validate_url_cached(url):
+    """Uncached body of SecurityValidator.validate_url"""
+    # Check for blocked patterns
+    if SecurityValidator._BLOCKED_COMBINED.search(url):
+        return False, "URL contains suspicious content"
+    
+    # Parse URL
+    try:
+        parsed = urlparse(url)
+    except Exception:
+        return False, "Invalid URL format"
+    
+    # Check scheme
+    if parsed.scheme not in SecurityValidator.ALLOWED_SCHEMES:
+        return False, f"Only {', '.join(SecurityValidator.ALLOWED_SCHEMES)} URLs are allowed"
+    
+    # Check for localhost/private IPs (prevent SSRF)
+    hostname = parsed.hostname
+    if hostname:
+        # Normalise internationalised hosts the way the downloader will
+        # resolve them (fullwidth digits, ideographic dots -> ASCII)
+        if not hostname.isascii():
+            try:
+                hostname = hostname.encode('idna').decode('ascii')
+            except UnicodeError:
+                return False, "Invalid URL format"
+        
+        # urlparse already lowercases the hostname; a trailing dot (fully
+        # qualified form) resolves the same host
+        hostname_lower = hostname.rstrip('.')
+        
+        # Block localhost and internal-only domains
+        if hostname_lower in SecurityValidator._LOCAL_HOSTS or \
+           hostname_lower.endswith(SecurityValidator._BLOCKED_HOST_SUFFIXES):
+            return False, "Local URLs are not allowed"
+        
+        # Block every IP address that is not publicly routable (loopback,
+        # private, link-local metadata endpoints, CGNAT, reserved)
+        ip = _parse_ip_host(hostname_lower)
+        
+        if ip is not None:
+            if ip.is_loopback or ip.is_unspecified:
+                return False, "Local URLs are not allowed"
+            
+            if not ip.is_global or ip.is_multicast:
+                return False, "Private IP addresses are not allowed"
+    
+    return True, None
+
+
+# Characters bleach would escape, strip or normalise; text without any of
+# them comes back from bleach.clean unchanged
+_NEEDS_BLEACH = re.compile(r'[\x00-\x08\x0b-\x1f<>&]')
+
+
+# bleach (and html5lib behind it) is imported on first use, not at startup
+_bleach = None
+
+
+# Titles and IDs repeat across retries and metadata re-fetches
+@lru_cache(maxsize=2048)
+def _sanitize_cached(text):
+    """Uncached body of SecurityValidator.sanitize_string"""
+    global _bleach
+    
+    if _NEEDS_BLEACH.search(text):
+        if _bleach is None:
+            import bleach as _bleach
+        
+        # Remove HTML tags and suspicious content
+        text = _bleach.clean(text, tags=[], strip=True)
+        
+        # Remove null bytes
+        text = text.replace('\x00', '')
+    
+    return text.strip()
+
+
 class RequestValidator:
     """Validates API requests"""
     
+    # Parsed JSON bodies keyed by raw request body, least recently used first.
+    # Bodies are bounded by check_request_size and MAX_CONTENT_LENGTH
+    JSON_CACHE_SIZE = 128
+    _json_cache = OrderedDict()
+    _json_cache_lock = threading.Lock()
+    
     @staticmethod
     def validate_json_request(required_fields=None):
         """
         Decorator to validate JSON requests
         
+        The parsed body is stored as g.json_data. Identical bodies share one
+        parsed object, so views must treat it as read-only.
+        
         Args:
             required_fields (list): List of required field names
         """
@@ -192,12 +304,9 @@ class RequestValidator:
                     }), 400
                 
                 # Get JSON data
-                try:
-                    data = request.get_json()
-                except Exception:
-                    return jsonify({
-                        'error': 'Invalid JSON format'
-                    }), 400
+                data, error = RequestValidator.load_json()
+                if error:
+                    return jsonify({'error': error}), 400
                 
                 # Check required fields
                 if required_fields:
@@ -211,11 +320,73 @@ class RequestValidator:
                             'error': f'Missing required fields: {", ".join(missing_fields)}'
                         }), 400
                 
+                g.json_data = data
                 return f(*args, **kwargs)
             
             return wrapped
         return decorator
     
+    @staticmethod
+    def load_json():
+        """
+        Parse the current JSON body, reusing the parse of an identical body
+        
+        Safe to call more than once per request (e.g. from a rate-limit cost
+        function and then the view); the body is parsed at most once.
+        
+        Returns:
+            tuple: (data, error_message)
+        """
+        raw = request.get_data(cache=True)
+        cache = RequestValidator._json_cache
+        
+        with RequestValidator._json_cache_lock:
+            result = cache.get(raw)
+            if result is not None:
+                cache.move_to_end(raw)
+                return result
+        
+        try:
+            result = request.get_json(), None
+        except Exception:
+            result = None, 'Invalid JSON format'
+        
+        with RequestValidator._json_cache_lock:
+            cache[raw] = result
+            if len(cache) > RequestValidator.JSON_CACHE_SIZE:
+                cache.popitem(last=False)
+        
+        return result
+    
+    @staticmethod
+    def json_list_length(field, maximum, max_size):
+        """
+        Build a rate-limit cost function counting a JSON list field
+        
+        Runs before check_request_size, so bodies without a declared length
+        or over max_size are charged the maximum without being parsed.
+        
+        Args:
+            field (str): Name of the list field in the JSON body
+            maximum (int): Largest cost charged for one request
+            max_size (int): Largest body in bytes the route accepts
+            
+        Returns:
+            callable: Returns the list length clamped to 1..maximum
+        """
+        def cost():
+            content_length = request.content_length
+            if content_length is None or content_length > max_size or not request.is_json:
+                return maximum
+            
+            data, _ = RequestValidator.load_json()
+            items = data.get(field) if isinstance(data, dict) else None
+            if not isinstance(items, list):
+                return 1
+            return min(max(len(items), 1), maximum)
+        
+        return cost
+    
     @staticmethod
     def check_request_size(max_size=1024):
         """
@@ -243,8 +414,12 @@ class RequestValidator:
 class AntiAbuse:
     """Anti-abuse mechanisms"""
     
-    # Store request timestamps per IP
+    # Store request timestamps per IP (oldest first)
     _request_log = {}
+    _request_log_lock = threading.Lock()
+    
+    # Drop idle IPs once this many are tracked
+    MAX_TRACKED_IPS = 10000
     
     @staticmethod
     def check_rate_limit(ip, max_requests=10, window=60):
@@ -259,38 +434,52 @@ class AntiAbuse:
         Returns:
             bool: True if allowed, False if rate limited
         """
-        current_time = time.time()
+        log = AntiAbuse._request_log
         
-        if ip not in AntiAbuse._request_log:
-            AntiAbuse._request_log[ip] = []
-        
-        # Clean old requests
-        AntiAbuse._request_log[ip] = [
-            timestamp for timestamp in AntiAbuse._request_log[ip]
-            if current_time - timestamp < window
-        ]
-        
-        # Check rate limit
-        if len(AntiAbuse._request_log[ip]) >= max_requests:
-            return False
-        
-        # Add current request
-        AntiAbuse._request_log[ip].append(current_time)
+        with AntiAbuse._request_log_lock:
+            # Monotonic, so clock adjustments cannot shift the window
+            now = _monotonic()
+            
+            # Forget IPs with no recent requests
+            if len(log) > AntiAbuse.MAX_TRACKED_IPS:
+                AntiAbuse._forget_idle_ips(now, window)
+            
+            timestamps = log.setdefault(ip, deque())
+            
+            # Clean old requests
+            while timestamps and now - timestamps[0] >= window:
+                timestamps.popleft()
+            
+            # Check rate limit
+            if len(timestamps) >= max_requests:
+                return False
+            
+            # Add current request
+            timestamps.append(now)
         
         return True
     
+    @staticmethod
+    def _forget_idle_ips(now, window):
+        """Remove IPs whose timestamps have all expired (caller holds the lock)"""
+        log = AntiAbuse._request_log
+        idle = [
+            ip for ip, timestamps in log.items()
+            if not timestamps or now - timestamps[-1] >= window
+        ]
+        for ip in idle:
+            del log[ip]
+    
     @staticmethod
     def generate_request_id():
         """Generate unique request ID for tracking"""
-        return hashlib.sha256(
-            f"{time.time()}{request.remote_addr}".encode()
-        ).hexdigest()[:16]
+        return hashlib.blake2b(
+            f"{time.time_ns()}{request.remote_addr}".encode(), digest_size=8
+        ).hexdigest()
 
 
 def secure_headers():
     """Add security headers to response"""
-    from flask import make_response
-    
     def decorator(f):
         @wraps(f)
         def wrapped(*args, **kwargs):
@@ -316,13 +505,11 @@ class Obfuscator:
     @staticmethod
     def encode_string(s):
         """Encode string to base64-like format"""
-        import base64
         return base64.b64encode(s.encode()).decode()
     
     @staticmethod
     def decode_string(s):
         """Decode string from base64-like format"""
-        import base64
         try:
             return base64.b64decode(s.encode()).decode()
         except Exception:
@@ -333,3 +520,36 @@ class Obfuscator:
         """Create hash of string"""
         return hashlib.sha256(s.encode()).hexdigest()
 
+
+if __name__ == '__main__':
+    # SSRF regression check
+    blocked = [
+        'http://localhost/', 'http://127.0.0.1/', 'http://[::1]/',
+        'http://0.0.0.0/', 'http://10.1.1.1/', 'http://172.16.0.1/',
+        'http://192.168.1.1/', 'http://169.254.169.254/latest',
+        'http://100.64.0.1/', 'http://[::ffff:10.0.0.1]/',
+        # Shorthand, decimal, hex and octal IPv4 forms
+        'http://10.1/', 'http://192.168.1/', 'http://172.16.1/',
+        'http://127.1/', 'http://2130706433/', 'http://0x7f000001/',
+        'http://0177.0.0.1/',
+        # Fullwidth digits and ideographic dots (IDNA-normalised to 127.0.0.1)
+        'http://１２７.０.０.１/', 'http://127。0。0。1/',
+        # Internal-only names
+        'http://localhost./', 'http://127.0.0.1./', 'http://foo.localhost/',
+        'http://metadata.google.internal/', 'http://printer.local/',
+        'http://router.home.arpa/',
+    ]
+    allowed = [
+        'https://www.youtube.com/watch?v=test', 'http://172.200.1.1/',
+        'http://8.8.8.8/', 'http://cafe.be/', 'https://internal.com/',
+    ]
+    
+    for url in blocked:
+        is_valid, error = SecurityValidator.validate_url(url)
+        assert not is_valid, url
+        print(f"Blocked: {url} ({error})")
+    
+    for url in allowed:
+        is_valid, error = SecurityValidator.validate_url(url)
+        assert is_valid, (url, error)
+        print(f"Allowed: {url}")
@@ -12,6 +12,7 @@
 // Global variables
 let currentDownloadId = null;
 let progressCheckInterval = null;
+let progressStream = null;
 
 // DOM Elements
 const videoUrlInput = document.getElementById('videoUrl');
@@ -238,9 +239,8 @@ async function startDownload() {
         progressSection.classList.remove('hidden');
         progressSection.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
         
-        // Start checking progress
-        checkProgress();
-        progressCheckInterval = setInterval(checkProgress, 1000);
+        // Start receiving progress updates
+        startProgressUpdates();
         
     } catch (error) {
         showError('Failed to start download. Please try again.');
@@ -250,102 +250,144 @@ async function startDownload() {
     }
 }
 
+// Start progress updates: server-sent events when supported, polling otherwise
+function startProgressUpdates() {
+    if (!window.EventSource) {
+        startProgressPolling();
+        return;
+    }
+    
+    progressStream = new EventSource(`/api/progress/stream/${encodeURIComponent(currentDownloadId)}`);
+    progressStream.onmessage = (event) => renderProgress(JSON.parse(event.data));
+    progressStream.addEventListener('reconnect', () => {
+        // Server ends streams periodically - open a fresh one
+        progressStream.close();
+        progressStream = null;
+        if (currentDownloadId) {
+            startProgressUpdates();
+        }
+    });
+    progressStream.onerror = () => {
+        // Stream dropped before the download finished - fall back to polling
+        if (progressStream) {
+            progressStream.close();
+            progressStream = null;
+        }
+        if (currentDownloadId) {
+            startProgressPolling();
+        }
+    };
+}
+
+// Poll download progress every second
+function startProgressPolling() {
+    if (progressCheckInterval) return;
+    checkProgress();
+    progressCheckInterval = setInterval(checkProgress, 1000);
+}
+
 // Check download progress
 async function checkProgress() {
     if (!currentDownloadId) return;
     
     try {
         const response = await fetch(`/api/progress/${currentDownloadId}`);
-        const data = await response.json();
-        
-        if (data.error) {
-            showError(data.error);
-            stopProgressCheck();
-            return;
-        }
-        
-        // Update progress bar
-        const progress = data.progress || 0;
-        document.getElementById('progressFill').style.width = progress + '%';
-        
-        // Update progress text
-        let statusText = '';
-        if (data.status === 'queued') {
-            statusText = 'Queued...';
-        } else if (data.status === 'starting') {
-            statusText = 'Starting download...';
-        } else if (data.status === 'downloading') {
-            statusText = `Downloading: ${data.title || 'video'}`;
-        } else if (data.status === 'processing') {
-            statusText = 'Processing video...';
-        } else if (data.status === 'completed') {
-            statusText = 'Download completed!';
-        } else if (data.status === 'error') {
-            statusText = 'Error: ' + (data.error || 'Unknown error');
-        }
-        
-        document.getElementById('progressText').textContent = statusText;
+        renderProgress(await response.json());
+    } catch (error) {
+        console.error('Error checking progress:', error);
+    }
+}
+
+// Update the progress section from a progress entry
+function renderProgress(data) {
+    if (data.error) {
+        showError(data.error);
+        stopProgressCheck();
+        return;
+    }
+    
+    // Update progress bar
+    const progress = data.progress || 0;
+    document.getElementById('progressFill').style.width = progress + '%';
+    
+    // Update progress text
+    let statusText = '';
+    if (data.status === 'queued') {
+        statusText = 'Queued...';
+    } else if (data.status === 'starting') {
+        statusText = 'Starting download...';
+    } else if (data.status === 'downloading') {
+        statusText = `Downloading: ${data.title || 'video'}`;
+    } else if (data.status === 'processing') {
+        statusText = 'Processing video...';
+    } else if (data.status === 'completed') {
+        statusText = 'Download completed!';
+    } else if (data.status === 'error') {
+        statusText = 'Error: ' + (data.error || 'Unknown error');
+    }
+    
+    document.getElementById('progressText').textContent = statusText;
+    
+    // Update stats
+    if (data.status === 'downloading' && data.speed) {
+        const downloaded = formatBytes(data.downloaded || 0);
+        const total = formatBytes(data.total || 0);
+        const speed = formatBytes(data.speed || 0);
+        const eta = data.eta ? formatTime(data.eta) : 'Unknown';
         
-        // Update stats
-        if (data.status === 'downloading' && data.speed) {
-            const downloaded = formatBytes(data.downloaded || 0);
-            const total = formatBytes(data.total || 0);
-            const speed = formatBytes(data.speed || 0);
-            const eta = data.eta ? formatTime(data.eta) : 'Unknown';
-            
-            document.getElementById('progressStats').textContent = 
-                `${downloaded} / ${total} • ${speed}/s • ETA: ${eta}`;
-        } else if (data.status === 'completed') {
-            document.getElementById('progressStats').textContent = 'Video saved to downloads folder';
-        } else {
-            document.getElementById('progressStats').textContent = '';
-        }
+        document.getElementById('progressStats').textContent = 
+            `${downloaded} / ${total} • ${speed}/s • ETA: ${eta}`;
+    } else if (data.status === 'completed') {
+        document.getElementById('progressStats').textContent = 'Video saved to downloads folder';
+    } else {
+        document.getElementById('progressStats').textContent = '';
+    }
+    
+    // Handle completion
+    if (data.status === 'completed') {
+        stopProgressCheck();
+        showSuccess('Download completed! File is downloading to your computer...');
+        loadHistory();
         
-        // Handle completion
-        if (data.status === 'completed') {
-            stopProgressCheck();
-            showSuccess('Download completed! File is downloading to your computer...');
-            loadHistory();
-            
-            // Trigger browser download
-            if (data.filename) {
-                // Create a temporary link to trigger download
-                const downloadLink = document.createElement('a');
-                downloadLink.href = `/api/file/${encodeURIComponent(data.filename)}`;
-                downloadLink.download = data.filename;
-                downloadLink.style.display = 'none';
-                document.body.appendChild(downloadLink);
-                downloadLink.click();
-                document.body.removeChild(downloadLink);
-            }
-            
-            // Reset UI
-            setTimeout(() => {
-                progressSection.classList.add('hidden');
-                downloadBtn.disabled = false;
-                downloadBtn.innerHTML = '<i class="fas fa-download"></i> Download Now';
-            }, 3000);
+        // Trigger browser download
+        if (data.filename) {
+            // Create a temporary link to trigger download
+            const downloadLink = document.createElement('a');
+            downloadLink.href = `/api/file/${encodeURIComponent(data.filename)}`;
+            downloadLink.download = data.filename;
+            downloadLink.style.display = 'none';
+            document.body.appendChild(downloadLink);
+            downloadLink.click();
+            document.body.removeChild(downloadLink);
         }
         
-        // Handle error
-        if (data.status === 'error') {
-            stopProgressCheck();
-            showError(data.error || 'Download failed');
-            
-            setTimeout(() => {
-                progressSection.classList.add('hidden');
-                downloadBtn.disabled = false;
-                downloadBtn.innerHTML = '<i class="fas fa-download"></i> Download Now';
-            }, 3000);
-        }
+        // Reset UI
+        setTimeout(() => {
+            progressSection.classList.add('hidden');
+            downloadBtn.disabled = false;
+            downloadBtn.innerHTML = '<i class="fas fa-download"></i> Download Now';
+        }, 3000);
+    }
+    
+    // Handle error
+    if (data.status === 'error') {
+        stopProgressCheck();
+        showError(data.error || 'Download failed');
         
-    } catch (error) {
-        console.error('Error checking progress:', error);
+        setTimeout(() => {
+            progressSection.classList.add('hidden');
+            downloadBtn.disabled = false;
+            downloadBtn.innerHTML = '<i class="fas fa-download"></i> Download Now';
+        }, 3000);
     }
 }
 
 // Stop progress checking
 function stopProgressCheck() {
+    if (progressStream) {
+        progressStream.close();
+        progressStream = null;
+    }
     if (progressCheckInterval) {
         clearInterval(progressCheckInterval);
         progressCheckInterval = null;
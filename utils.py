@@ -3,8 +3,23 @@
 
 import os
 import re
+import time
+from bisect import bisect_right
+from functools import lru_cache
+from urllib.parse import urlparse
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
+
+# Translation table deleting characters not allowed in filenames on
+# common operating systems
+_INVALID_FILENAME_CHARS = str.maketrans('', '', '<>:"/\\|?*')
+
+# Longest URL accepted (same limit as SecurityValidator.MAX_URL_LENGTH)
+_MAX_URL_LENGTH = 2048
+
+# Host part of an http(s) URL: domain name or IPv4 address
+_URL_HOST_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9.-]*\Z')
+
 
 def format_bytes(bytes_value: int) -> str:
     """
@@ -16,18 +31,15 @@ def format_bytes(bytes_value: int) -> str:
     Returns:
         Formatted string (e.g., "1.5 GB")
     """
-    if bytes_value == 0:
+    if bytes_value <= 0:
         return '0 Bytes'
     
-    sizes = ['Bytes', 'KB', 'MB', 'GB', 'TB']
-    k = 1024
-    i = 0
+    sizes = ('Bytes', 'KB', 'MB', 'GB', 'TB')
     
-    while bytes_value >= k and i < len(sizes) - 1:
-        bytes_value /= k
-        i += 1
+    # Each unit is 2**10 larger, so the unit index is floor(log2) // 10
+    i = min(max(int(bytes_value).bit_length() - 1, 0) // 10, len(sizes) - 1)
     
-    return f"{bytes_value:.2f} {sizes[i]}"
+    return f"{bytes_value / (1 << (i * 10)):.2f} {sizes[i]}"
 
 
 def format_duration(seconds: int) -> str:
@@ -63,8 +75,7 @@ def sanitize_filename(filename: str) -> str:
         Sanitized filename safe for all operating systems
     """
     # Remove invalid characters
-    invalid_chars = r'[<>:"/\\|?*]'
-    filename = re.sub(invalid_chars, '', filename)
+    filename = filename.translate(_INVALID_FILENAME_CHARS)
     
     # Remove leading/trailing dots and spaces
     filename = filename.strip('. ')
@@ -88,15 +99,59 @@ def validate_url(url: str) -> bool:
     Returns:
         True if valid URL, False otherwise
     """
-    url_pattern = re.compile(
-        r'^https?://'  # http:// or https://
-        r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'  # domain
-        r'localhost|'  # localhost
-        r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'  # or IP
-        r'(?::\d+)?'  # optional port
-        r'(?:/?|[/?]\S+)$', re.IGNORECASE
-    )
-    return bool(url_pattern.match(url))
+    # Check length before caching, so oversized input is never retained
+    if not isinstance(url, str) or len(url) > _MAX_URL_LENGTH:
+        return False
+    
+    return _validate_url_cached(url)
+
+
+@lru_cache(maxsize=4096)
+def _validate_url_cached(url: str) -> bool:
+    """Uncached body of validate_url."""
+    try:
+        parsed = urlparse(url)
+        parsed.port  # raises ValueError for a malformed port
+    except ValueError:
+        return False
+    
+    if parsed.scheme not in ('http', 'https') or not parsed.hostname:
+        return False
+    
+    return bool(_URL_HOST_RE.match(parsed.hostname))
+
+
+# yt-dlp error message patterns, one named group per error code
+_ERROR_PATTERNS = re.compile(
+    r'(?P<drm>\bdrm\b)|'
+    r'(?P<login>need to log in|login required|cookies|nsfw)|'
+    r'(?P<unsupported>unsupported url)|'
+    r'(?P<no_formats>no video formats found)|'
+    r'(?P<not_found>http error 404)|'
+    r'(?P<extraction>unable to extract|failed to parse)|'
+    r'(?P<cloudflare>cloudflare|http error 403|impersonate)',
+    re.IGNORECASE
+)
+
+# Error codes in order of precedence when a message matches several
+ERROR_CODES = ('drm', 'login', 'unsupported', 'no_formats', 'not_found', 'extraction', 'cloudflare')
+
+
+def classify_error(message: str) -> str:
+    """
+    Classify a yt-dlp error message.
+    
+    Args:
+        message: Error message from yt-dlp
+        
+    Returns:
+        One of ERROR_CODES, or 'unknown' if nothing matched
+    """
+    found = {match.lastgroup for match in _ERROR_PATTERNS.finditer(message)}
+    for code in ERROR_CODES:
+        if code in found:
+            return code
+    return 'unknown'
 
 
 def get_file_extension(format_type: str, quality: str = 'best') -> str:
@@ -134,6 +189,11 @@ def calculate_eta(downloaded: int, total: int, speed: float) -> Optional[int]:
     return int(remaining / speed)
 
 
+# Minimum height for each quality label, ascending
+_HEIGHT_THRESHOLDS = (360, 480, 720, 1080, 1440, 2160)
+_HEIGHT_LABELS = ('360p', '480p', '720p', '1080p', '2K', '4K')
+
+
 def get_quality_label(height: int) -> str:
     """
     Convert video height to quality label.
@@ -144,20 +204,10 @@ def get_quality_label(height: int) -> str:
     Returns:
         Quality label (e.g., "1080p", "4K")
     """
-    if height >= 2160:
-        return "4K"
-    elif height >= 1440:
-        return "2K"
-    elif height >= 1080:
-        return "1080p"
-    elif height >= 720:
-        return "720p"
-    elif height >= 480:
-        return "480p"
-    elif height >= 360:
-        return "360p"
-    else:
-        return f"{height}p"
+    i = bisect_right(_HEIGHT_THRESHOLDS, height) - 1
+    if i >= 0:
+        return _HEIGHT_LABELS[i]
+    return f"{height}p"
 
 
 def format_timestamp(iso_string: str) -> str:
@@ -198,6 +248,26 @@ def clean_title(title: str) -> str:
     return title
 
 
+# Quality name -> (type, height) for parse_quality_string
+_QUALITY_TABLE = {
+    'best': ('best', None),
+    '4k': ('4k', 2160),
+    '2160p': ('4k', 2160),
+    '1080p': ('1080p', 1080),
+    '720p': ('720p', 720),
+    '480p': ('480p', 480),
+}
+
+# Substrings checked in order when the name is not in _QUALITY_TABLE
+_QUALITY_MARKERS = (
+    ('4k', ('4k', 2160)),
+    ('2160', ('4k', 2160)),
+    ('1080', ('1080p', 1080)),
+    ('720', ('720p', 720)),
+    ('480', ('480p', 480)),
+)
+
+
 def parse_quality_string(quality_str: str) -> Dict[str, Any]:
     """
     Parse quality string to extract details.
@@ -210,18 +280,23 @@ def parse_quality_string(quality_str: str) -> Dict[str, Any]:
     """
     quality_str = quality_str.lower()
     
-    if quality_str == 'best':
-        return {'type': 'best', 'height': None}
-    elif '4k' in quality_str or '2160' in quality_str:
-        return {'type': '4k', 'height': 2160}
-    elif '1080' in quality_str:
-        return {'type': '1080p', 'height': 1080}
-    elif '720' in quality_str:
-        return {'type': '720p', 'height': 720}
-    elif '480' in quality_str:
-        return {'type': '480p', 'height': 480}
-    else:
-        return {'type': quality_str, 'height': None}
+    # Exact quality names are a single lookup
+    found = _QUALITY_TABLE.get(quality_str)
+    if found is None:
+        # Otherwise look for a resolution inside the string (e.g. "1080p60")
+        found = next(
+            (entry for marker, entry in _QUALITY_MARKERS if marker in quality_str),
+            (quality_str, None)
+        )
+    
+    quality_type, height = found
+    return {'type': quality_type, 'height': height}
+
+
+# Free space per path as (checked_at, available_bytes), reused for
+# STATVFS_CACHE_TTL seconds
+STATVFS_CACHE_TTL = 5.0
+_STATVFS_CACHE: Dict[str, Tuple[float, int]] = {}
 
 
 def check_disk_space(path: str, required_bytes: int) -> bool:
@@ -235,10 +310,16 @@ def check_disk_space(path: str, required_bytes: int) -> bool:
     Returns:
         True if enough space available, False otherwise
     """
+    now = time.monotonic()
+    cached = _STATVFS_CACHE.get(path)
+    if cached and now - cached[0] < STATVFS_CACHE_TTL:
+        return cached[1] >= required_bytes
+    
     try:
         stat = os.statvfs(path) if hasattr(os, 'statvfs') else None
         if stat:
             available = stat.f_bavail * stat.f_frsize
+            _STATVFS_CACHE[path] = (now, available)
             return available >= required_bytes
     except (OSError, AttributeError):
         pass
@@ -265,8 +346,8 @@ def get_file_info(filepath: str) -> Optional[Dict[str, Any]]:
         'name': os.path.basename(filepath),
         'size': stat.st_size,
         'size_formatted': format_bytes(stat.st_size),
-        'modified': datetime.fromtimestamp(stat.st_mtime).isoformat(),
-        'created': datetime.fromtimestamp(stat.st_ctime).isoformat(),
+        'modified': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(stat.st_mtime)),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(stat.st_ctime)),
     }
 
 
@@ -333,11 +414,27 @@ class Colors:
         Colors.ENDC = ''
         Colors.BOLD = ''
         Colors.UNDERLINE = ''
+        
+        # Re-render the banner without colors
+        global _BANNER
+        _BANNER = None
+
+
+# Rendered banner, built on first print with the current Colors
+_BANNER = None
 
 
 def print_banner():
     """Print application banner"""
-    banner = f"""
+    global _BANNER
+    if _BANNER is None:
+        _BANNER = _render_banner()
+    print(_BANNER)
+
+
+def _render_banner() -> str:
+    """Render the application banner with the current Colors"""
+    return f"""
 {Colors.CYAN}╔═══════════════════════════════════════════════════════════════╗
 ║                                                               ║
 ║   {Colors.BOLD}█████╗ ███╗   ██╗██╗   ██╗██╗   ██╗██╗██████╗ ███████╗ ██████╗{Colors.ENDC}{Colors.CYAN}  ║
@@ -352,7 +449,6 @@ def print_banner():
 ║                                                               ║
 ╚═══════════════════════════════════════════════════════════════╝{Colors.ENDC}
 """
-    print(banner)
 
 
 if __name__ == '__main__':